@@ -1,20 +1,20 @@
 #!/usr/bin/env python3
 """YouTube Downloader — unified menu bar + GUI app."""
 
+import atexit
+import functools
+import json
 import os
+import re
 import subprocess
 import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 
 import platform
 import sys
 
-import certifi
-
-os.environ["SSL_CERT_FILE"] = certifi.where()
-os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
-
 IS_WINDOWS = platform.system() == "Windows"
 
 # Find ffmpeg
@@ -31,26 +31,167 @@ for p in [FFMPEG_DIR, "/opt/homebrew/bin", "/usr/local/bin"]:
         sep = ";" if IS_WINDOWS else ":"
         os.environ["PATH"] = p + sep + os.environ.get("PATH", "")
 
+FFMPEG = os.path.join(FFMPEG_DIR, "ffmpeg.exe" if IS_WINDOWS else "ffmpeg")
+FFPROBE = os.path.join(FFMPEG_DIR, "ffprobe.exe" if IS_WINDOWS else "ffprobe")
+# The Windows build is --windowed, so console children would each pop up a console window
+NO_WINDOW = subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0
+
+# Encoder-specific args, roughly matching libx264 -crf 18 quality
+H264_ENCODER_ARGS = {
+    "h264_videotoolbox": ["-c:v", "h264_videotoolbox", "-q:v", "60"],
+    "h264_nvenc":        ["-c:v", "h264_nvenc", "-preset", "p5", "-rc", "vbr", "-cq", "19", "-b:v", "0"],
+    "h264_amf":          ["-c:v", "h264_amf", "-quality", "quality", "-rc", "cqp", "-qp_i", "18", "-qp_p", "18"],
+    "libx264":           ["-c:v", "libx264", "-preset", "medium", "-crf", "18"],
+}
+
+
+def _encoder_works(encoder):
+    """Return True if a tiny test encode succeeds — builds list encoders the GPU may lack."""
+    cmd = [FFMPEG, "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", "color=s=256x256:d=0.1",
+           "-pix_fmt", "yuv420p", *H264_ENCODER_ARGS[encoder], "-f", "null", "-"]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=15, creationflags=NO_WINDOW).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def _detect_h264_encoder():
+    """Pick the fastest H.264 encoder that actually works on this machine, preferring hardware."""
+    try:
+        out = subprocess.run([FFMPEG, "-hide_banner", "-encoders"],
+                             capture_output=True, text=True, creationflags=NO_WINDOW).stdout
+    except OSError:
+        return "libx264"
+    found = set(re.findall(r"\b(h264_videotoolbox|h264_nvenc|h264_amf)\b", out))
+    for encoder in ("h264_videotoolbox", "h264_nvenc", "h264_amf"):
+        if encoder in found and _encoder_works(encoder):
+            return encoder
+    return "libx264"
+
+
 import customtkinter as ctk
-import yt_dlp
 
 DOWNLOAD_DIR = os.path.expanduser("~/Downloads")
 
-QUALITY_MAP = {
-    "Best":   "bestvideo+bestaudio/best",
-    "4K":     "bestvideo[height<=2160]+bestaudio/best[height<=2160]/bestvideo+bestaudio/best",
-    "1440p":  "bestvideo[height<=1440]+bestaudio/best[height<=1440]/bestvideo+bestaudio/best",
-    "1080p":  "bestvideo[height<=1080]+bestaudio/best[height<=1080]/bestvideo+bestaudio/best",
-    "720p":   "bestvideo[height<=720]+bestaudio/best[height<=720]/bestvideo+bestaudio/best",
-    "480p":   "bestvideo[height<=480]+bestaudio/best[height<=480]/bestvideo+bestaudio/best",
+# Prefer AVC/AAC where YouTube offers it (up to 1080p) so no re-encode is needed.
+# Above 1080p there is no AVC ladder, so those keep picking the highest resolution.
+QUALITY_LABELS = ("Best", "4K", "1440p", "1080p", "720p", "480p")
+FMT_DEFAULT = (
+    "bestvideo+bestaudio/best",
+    "bestvideo[height<=2160]+bestaudio/best[height<=2160]/bestvideo+bestaudio/best",
+    "bestvideo[height<=1440]+bestaudio/best[height<=1440]/bestvideo+bestaudio/best",
+    "bestvideo[height<=1080][vcodec^=avc]+bestaudio[acodec^=mp4a]/bestvideo[height<=1080]+bestaudio/best[height<=1080]/bestvideo+bestaudio/best",
+    "bestvideo[height<=720][vcodec^=avc]+bestaudio[acodec^=mp4a]/bestvideo[height<=720]+bestaudio/best[height<=720]/bestvideo+bestaudio/best",
+    "bestvideo[height<=480][vcodec^=avc]+bestaudio[acodec^=mp4a]/bestvideo[height<=480]+bestaudio/best[height<=480]/bestvideo+bestaudio/best",
+)
+FMT_AUDIO = "bestaudio/best"
+LABEL_IDX = {label: i for i, label in enumerate(QUALITY_LABELS)}
+
+
+def _video_only_format(fmt):
+    """Keep just the video side of each "video+audio" alternative in a format selector."""
+    alts = [alt.split("+")[0] for alt in fmt.split("/") if "+" in alt]
+    return "/".join(dict.fromkeys(alts))
+
+
+FMT_VIDEO_ONLY = tuple(_video_only_format(fmt) for fmt in FMT_DEFAULT)
+
+FORMAT = FMT_DEFAULT[0]
+
+# Parallel HLS/DASH fragment downloads
+CONCURRENCY_OPTIONS = ["1", "3", "5", "10"]
+CONCURRENT_FRAGMENTS = 5
+
+# Minimum seconds between progress updates sent to the Tk event loop
+PROGRESS_INTERVAL = 0.1
+
+# Options shared by every download on the app's long-lived YoutubeDL instances
+# yt-dlp loads certifi's CA bundle into its own SSL context, so no SSL_CERT_FILE is needed
+YDL_BASE_OPTS = {
+    "noplaylist": True, "quiet": True, "no_warnings": True,
+    "socket_timeout": 20,
+    "ffmpeg_location": FFMPEG_DIR,
 }
 
-FORMAT = QUALITY_MAP["Best"]
+
+_yt_dlp = None
+
+
+def yt_dlp_mod():
+    """Import yt_dlp on first use — it pulls in hundreds of extractor modules."""
+    global _yt_dlp
+    if _yt_dlp is None:
+        import yt_dlp
+        _yt_dlp = yt_dlp
+    return _yt_dlp
+
 
 # Global reference to the tkinter app so the menu bar can talk to it
 _app = None
 
 
+def _make_notifier():
+    """Return (refs, notify) for posting macOS notifications. Keep refs alive while notifying."""
+    try:
+        import UserNotifications as UN
+        from Foundation import NSObject
+        import objc
+        import uuid
+
+        # Banners are suppressed while the app is frontmost unless the delegate allows them
+        present = getattr(UN, "UNNotificationPresentationOptionBanner",
+                          UN.UNNotificationPresentationOptionAlert)
+
+        class NotificationDelegate(NSObject, protocols=[objc.protocolNamed("UNUserNotificationCenterDelegate")]):
+            def userNotificationCenter_willPresentNotification_withCompletionHandler_(
+                    self, center, notification, handler):
+                handler(present)
+
+        # Raises when the process has no bundle identifier (e.g. running from source)
+        center = UN.UNUserNotificationCenter.currentNotificationCenter()
+        delegate = NotificationDelegate.alloc().init()
+        center.setDelegate_(delegate)
+        center.requestAuthorizationWithOptions_completionHandler_(
+            UN.UNAuthorizationOptionAlert, lambda granted, error: None)
+
+        def notify(title, message):
+            content = UN.UNMutableNotificationContent.alloc().init()
+            content.setTitle_(title)
+            content.setBody_(message)
+            req = UN.UNNotificationRequest.requestWithIdentifier_content_trigger_(
+                uuid.uuid4().hex, content, None)
+            center.addNotificationRequest_withCompletionHandler_(req, None)
+
+        return (center, delegate), notify
+    except Exception:
+        pass
+
+    # Legacy API for older macOS; also needs a bundle identifier
+    try:
+        from Foundation import NSUserNotification, NSUserNotificationCenter
+        center = NSUserNotificationCenter.defaultUserNotificationCenter()
+    except Exception:
+        center = None
+    if center is not None:
+        def notify(title, message):
+            n = NSUserNotification.alloc().init()
+            n.setTitle_(title)
+            n.setInformativeText_(message)
+            center.deliverNotification_(n)
+
+        return (center,), notify
+
+    # Unbundled runs: osascript, with title/body passed as arguments rather than spliced into the script
+    def notify(title, message):
+        subprocess.run(["osascript", "-e", "on run argv",
+                        "-e", "display notification (item 2 of argv) with title (item 1 of argv)",
+                        "-e", "end run", title, message],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return (), notify
+
+
 def setup_menubar():
     """Create the macOS status bar icon + dropdown menu."""
     try:
@@ -61,6 +202,8 @@ def setup_menubar():
         from Foundation import NSObject as FNSObject
         import objc
 
+        notifier_refs, notify = _make_notifier()
+
         class MenuDelegate(NSObject):
             @objc.python_method
             def _quick_download(self):
@@ -82,22 +225,21 @@ def setup_menubar():
             @objc.python_method
             def _do_download(self, url):
                 try:
-                    os.system('osascript -e \'display notification "Starting download..." with title "YouTube Downloader"\'')
+                    notify("YouTube Downloader", "Starting download...")
                     opts = {
+                        **YDL_BASE_OPTS,
                         "format": FORMAT,
                         "outtmpl": os.path.join(DOWNLOAD_DIR, "%(title)s.%(ext)s"),
                         "merge_output_format": "mp4",
-                        "noplaylist": True, "quiet": True, "no_warnings": True,
-                        "ffmpeg_location": FFMPEG_DIR,
+                        "concurrent_fragment_downloads": CONCURRENT_FRAGMENTS,
                     }
-                    with yt_dlp.YoutubeDL(opts) as ydl:
+                    with yt_dlp_mod().YoutubeDL(opts) as ydl:
                         info = ydl.extract_info(url, download=False)
                         title = info.get("title", "Video")
-                        ydl.download([url])
-                        os.system(f'osascript -e \'display notification "{title}" with title "Download complete!"\'')
+                        ydl.process_ie_result(info, download=True)
+                        notify("Download complete!", title)
                 except Exception as e:
-                    msg = str(e)[:80].replace("'", "")
-                    os.system(f'osascript -e \'display notification "{msg}" with title "Download failed"\'')
+                    notify("Download failed", str(e)[:80])
 
             def doQuickDownload_(self, sender):
                 self._quick_download()
@@ -151,7 +293,7 @@ def setup_menubar():
         item.setMenu_(menu)
 
         # Keep references alive so they don't get garbage collected
-        setup_menubar._refs = (item, menu, delegate)
+        setup_menubar._refs = (item, menu, delegate, notifier_refs)
         return True
     except Exception:
         return False
@@ -164,7 +306,7 @@ class App(ctk.CTk):
         self.title("YouTube Downloader")
         screen_w = self.winfo_screenwidth()
         screen_h = self.winfo_screenheight()
-        win_w, win_h = 620, 520
+        win_w, win_h = 620, 580
         x = (screen_w - win_w) // 2
         y = (screen_h - win_h) // 2
         self.geometry(f"{win_w}x{win_h}+{x}+{y}")
@@ -176,12 +318,24 @@ class App(ctk.CTk):
         self._cancelled = False
         self._download_id = 0
         self._last_downloaded_file = None
+        # One YoutubeDL per kind of download, kept for the app's lifetime so the
+        # extractors and HTTP connections are reused across downloads
+        self._ydls = {}
+        self._ydl_lock = threading.Lock()
+        self._ydl_owner = 0
+        self._last_progress_ts = 0
+        self._progress_state = (0, "")
+        self._ffmpeg_proc = None
         self._build_ui()
+        threading.Thread(target=self._warm_ffmpeg, daemon=True).start()
 
-        # Set up menu bar icon after tkinter is initialized (macOS only)
+        # Set up menu bar icon once the window has painted (macOS only)
         self._has_menubar = False
         if not IS_WINDOWS:
-            self._has_menubar = setup_menubar()
+            self.after(50, self._setup_menubar)
+
+    def _setup_menubar(self):
+        self._has_menubar = setup_menubar()
         if self._has_menubar:
             self.protocol("WM_DELETE_WINDOW", self._on_close)
 
@@ -190,13 +344,24 @@ class App(ctk.CTk):
 
     def _build_ui(self):
         px = 24
-
-        # ── URL ──
-        ctk.CTkLabel(self, text="Paste a YouTube link", anchor="w",
-                     font=ctk.CTkFont(size=13), text_color="gray").pack(fill="x", padx=px, pady=(14, 0))
-        self.url_entry = ctk.CTkEntry(self, height=40, corner_radius=10,
-                                       placeholder_text="https://www.youtube.com/watch?v=...")
-        self.url_entry.pack(fill="x", padx=px, pady=(4, 0))
+        # Window size is fixed, so don't let every pack() re-layout the root
+        self.pack_propagate(False)
+        # Shared fonts — each CTkFont registers a new Tk font
+        font12 = ctk.CTkFont(size=12)
+        font13 = ctk.CTkFont(size=13)
+        bold14 = ctk.CTkFont(size=14, weight="bold")
+        bold16 = ctk.CTkFont(size=16, weight="bold")
+
+        # ── URLs (one per line) + batch counter ──
+        url_header = ctk.CTkFrame(self, fg_color="transparent")
+        url_header.pack(fill="x", padx=px, pady=(14, 0))
+        ctk.CTkLabel(url_header, text="Paste YouTube links (one per line)", anchor="w",
+                     font=font13, text_color="gray").pack(side="left")
+        self.count_label = ctk.CTkLabel(url_header, text="", anchor="e",
+                                         font=font13, text_color="gray")
+        self.count_label.pack(side="right")
+        self.url_text = ctk.CTkTextbox(self, height=100, corner_radius=10)
+        self.url_text.pack(fill="x", padx=px, pady=(4, 0))
 
         # ── Quality + Switches (same row) ──
         options_row = ctk.CTkFrame(self, fg_color="transparent")
@@ -205,13 +370,22 @@ class App(ctk.CTk):
         quality_frame = ctk.CTkFrame(options_row, fg_color="transparent")
         quality_frame.pack(side="left", padx=(0, 20))
         ctk.CTkLabel(quality_frame, text="Quality", anchor="w",
-                     font=ctk.CTkFont(size=13), text_color="gray").pack(anchor="w")
+                     font=font13, text_color="gray").pack(anchor="w")
         self.quality_var = ctk.StringVar(value="Best")
         self.quality_menu = ctk.CTkOptionMenu(
             quality_frame, variable=self.quality_var,
-            values=list(QUALITY_MAP.keys()), width=150, height=32, corner_radius=8)
+            values=QUALITY_LABELS, width=150, height=32, corner_radius=8)
         self.quality_menu.pack(anchor="w", pady=(4, 0))
 
+        concurrency_frame = ctk.CTkFrame(options_row, fg_color="transparent")
+        concurrency_frame.pack(side="left", padx=(0, 20))
+        ctk.CTkLabel(concurrency_frame, text="Concurrency", anchor="w",
+                     font=font13, text_color="gray").pack(anchor="w")
+        self.concurrency_var = ctk.StringVar(value=str(CONCURRENT_FRAGMENTS))
+        ctk.CTkOptionMenu(
+            concurrency_frame, variable=self.concurrency_var,
+            values=CONCURRENCY_OPTIONS, width=80, height=32, corner_radius=8).pack(anchor="w", pady=(4, 0))
+
         switch_frame = ctk.CTkFrame(options_row, fg_color="transparent")
         switch_frame.pack(side="left", fill="y")
 
@@ -229,7 +403,7 @@ class App(ctk.CTk):
 
         # ── Save to ──
         ctk.CTkLabel(self, text="Save to", anchor="w",
-                     font=ctk.CTkFont(size=13), text_color="gray").pack(fill="x", padx=px, pady=(16, 0))
+                     font=font13, text_color="gray").pack(fill="x", padx=px, pady=(16, 0))
         folder_row = ctk.CTkFrame(self, fg_color="transparent")
         folder_row.pack(fill="x", padx=px, pady=(4, 0))
         self.folder_var = ctk.StringVar(value=DOWNLOAD_DIR)
@@ -246,20 +420,20 @@ class App(ctk.CTk):
 
         self.dl_button = ctk.CTkButton(
             btn_frame, text="Download", height=48, corner_radius=12,
-            font=ctk.CTkFont(size=16, weight="bold"),
+            font=bold16,
             command=self._start_download)
         self.dl_button.pack(side="left", fill="x", expand=True, padx=(0, 6))
 
         self.cancel_button = ctk.CTkButton(
             btn_frame, text="Cancel", width=90, height=48, corner_radius=12,
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=bold14,
             fg_color="#cc0000", hover_color="#990000", state="disabled",
             command=self._cancel_download)
         self.cancel_button.pack(side="left", padx=(0, 6))
 
         self.again_button = ctk.CTkButton(
             btn_frame, text="New", width=70, height=48, corner_radius=12,
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=bold14,
             fg_color="#2d8a4e", hover_color="#1e6b3a",
             command=self._reset)
         self.again_button.pack(side="left")
@@ -268,7 +442,7 @@ class App(ctk.CTk):
         show_text = "Show in Explorer" if IS_WINDOWS else "Show in Finder"
         self.show_button = ctk.CTkButton(
             self, text=show_text, height=36, corner_radius=10,
-            font=ctk.CTkFont(size=13),
+            font=font13,
             fg_color="gray30", hover_color="gray40",
             command=self._show_in_finder)
         self.show_button.pack(fill="x", padx=px, pady=(8, 0))
@@ -279,11 +453,11 @@ class App(ctk.CTk):
         self.progress_bar.set(0)
 
         self.title_label = ctk.CTkLabel(self, text="", anchor="w", wraplength=560,
-                                         font=ctk.CTkFont(size=12))
+                                         font=font12)
         self.title_label.pack(fill="x", padx=px, pady=(8, 0))
 
         self.status_label = ctk.CTkLabel(self, text="Ready", anchor="w",
-                                          font=ctk.CTkFont(size=12), text_color="gray")
+                                          font=font12, text_color="gray")
         self.status_label.pack(fill="x", padx=px, pady=(2, 16))
 
     def _on_audio_only_toggle(self):
@@ -324,25 +498,31 @@ class App(ctk.CTk):
     def _reset(self):
         if self._downloading:
             return
-        self.url_entry.delete(0, "end")
+        self.url_text.delete("1.0", "end")
         self._set_progress(0)
         self._set_status("Ready")
         self.title_label.configure(text="")
+        self.count_label.configure(text="")
         self._last_downloaded_file = None
-        self.url_entry.focus()
+        self.url_text.focus()
 
     def _cancel_download(self):
         self._download_id += 1  # abandon current thread
         self._downloading = False
         self._cancelled = True
+        proc = self._ffmpeg_proc
+        if proc and proc.poll() is None:
+            # SIGTERM lets ffmpeg finish cleanly; kill it if it hasn't exited shortly after
+            proc.terminate()
+            threading.Timer(0.5, lambda: proc.poll() is None and proc.kill()).start()
         self._set_status("Cancelled.")
         self._set_progress(0)
         self.dl_button.configure(state="normal", text="Download")
         self.cancel_button.configure(state="disabled")
 
     def _start_download(self):
-        url = self.url_entry.get().strip()
-        if not url:
+        urls = [u.strip() for u in self.url_text.get("1.0", "end").splitlines() if u.strip()]
+        if not urls:
             self._set_status("Please enter a YouTube URL.")
             return
         if self._downloading:
@@ -355,105 +535,74 @@ class App(ctk.CTk):
         self._set_progress(0)
         self._set_status("Fetching video info...")
         self.title_label.configure(text="")
-        threading.Thread(target=self._download_thread, args=(url, self._download_id), daemon=True).start()
+        self.count_label.configure(text="")
+        threading.Thread(target=self._download_thread, args=(urls, self._download_id), daemon=True).start()
 
-    def _download_thread(self, url, my_id):
-        import glob, time
+    def _download_thread(self, urls, my_id):
         try:
             output_dir = self.folder_var.get()
             quality = self.quality_var.get()
             audio_only = self.audio_only_var.get()
             video_only = self.video_only_var.get()
+            concurrency = int(self.concurrency_var.get())
 
-            if audio_only:
-                fmt = "bestaudio/best"
-                postprocessors = [{"key": "FFmpegExtractAudio",
-                                   "preferredcodec": "mp3", "preferredquality": "320"}]
-            elif video_only:
-                base = QUALITY_MAP.get(quality, QUALITY_MAP["Best"])
-                fmt = base.split("+")[0]
-                postprocessors = []
-            else:
-                fmt = QUALITY_MAP.get(quality, QUALITY_MAP["Best"])
-                postprocessors = []
-
-            def progress_hook(d):
-                if self._download_id != my_id:
-                    raise Exception("cancelled")
-                if d["status"] == "downloading":
-                    total = d.get("total_bytes") or d.get("total_bytes_estimate")
-                    downloaded = d.get("downloaded_bytes", 0)
-                    if total and total > 0:
-                        self.after(0, self._set_progress, downloaded / total)
-                    speed = d.get("_speed_str", "")
-                    eta = d.get("_eta_str", "")
-                    pct_str = d.get("_percent_str", "")
-                    self.after(0, self._set_status, f"Downloading {pct_str}   Speed: {speed}   ETA: {eta}")
-                elif d["status"] == "finished":
-                    self.after(0, self._set_status, "Merging streams...")
-                    self.after(0, self._set_progress, 0.95)
+            i = LABEL_IDX.get(quality, 0)
+            fmt = FMT_AUDIO if audio_only else (FMT_VIDEO_ONLY[i] if video_only else FMT_DEFAULT[i])
 
+            # Per-download options, layered over YDL_BASE_OPTS for this download only
             opts = {
                 "format": fmt,
-                "outtmpl": os.path.join(output_dir, "%(title)s.%(ext)s"),
+                "outtmpl": {"default": os.path.join(output_dir, "%(title)s.%(ext)s")},
                 "merge_output_format": "mp4" if not audio_only else None,
-                "progress_hooks": [progress_hook],
-                "postprocessors": postprocessors,
                 "postprocessor_args": {"merger": ["-c:a", "aac", "-b:a", "256k"]} if not audio_only else None,
-                "noplaylist": True, "quiet": True, "no_warnings": True,
-                "ffmpeg_location": FFMPEG_DIR,
+                "concurrent_fragment_downloads": concurrency,
             }
             opts = {k: v for k, v in opts.items() if v is not None}
 
-            start_time = time.time()
-
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                title = info.get("title", "Unknown")
-                duration = info.get("duration_string", "?")
-                self.after(0, lambda t=title, d=duration: self.title_label.configure(text=f"{t}  ({d})"))
-
+            errors = []
+            # A cancelled download may still be unwinding on the shared instance
+            with self._ydl_lock:
                 if self._download_id != my_id:
                     return
+                ydl = self._get_ydl(audio_only)
+                saved = {k: ydl.params[k] for k in opts if k in ydl.params}
+                saved_selector = ydl.format_selector
+                self._ydl_owner = my_id
+                try:
+                    # The other options are read at download time, but YoutubeDL only
+                    # turns params["format"] into a selector in __init__
+                    ydl.params.update(opts)
+                    ydl.format_selector = ydl.build_format_selector(fmt)
+                    # The whole batch shares one YoutubeDL and its HTTP connections
+                    for n, url in enumerate(urls, 1):
+                        if len(urls) > 1:
+                            self.after(0, lambda t=f"File {n} of {len(urls)}": self.count_label.configure(text=t))
+                        try:
+                            downloaded_file = self._download_one(ydl, url, my_id, output_dir, audio_only)
+                        except Exception as e:
+                            # One bad link shouldn't abort the rest of a batch
+                            if self._download_id != my_id or len(urls) == 1:
+                                raise
+                            errors.append(e)
+                            continue
+                        if self._download_id != my_id:
+                            return
+                        self._last_downloaded_file = downloaded_file
+                finally:
+                    for k in opts:
+                        ydl.params.pop(k, None)
+                    ydl.params.update(saved)
+                    ydl.format_selector = saved_selector
 
-                # Get the actual filename yt-dlp will use
-                prepared = ydl.prepare_filename(info)
-                ext = "mp3" if audio_only else "mp4"
-                expected_file = os.path.splitext(prepared)[0] + "." + ext
-
-                self.after(0, self._set_status, "Downloading...")
-                ydl.download([url])
-
-            if self._download_id != my_id:
-                return
-
-            # Find the downloaded file
-            downloaded_file = None
-            if os.path.exists(expected_file):
-                downloaded_file = expected_file
-            else:
-                # Fallback: find newest mp4/mp3 in output dir created after we started
-                search_ext = "*.mp3" if audio_only else "*.mp4"
-                candidates = glob.glob(os.path.join(output_dir, search_ext))
-                candidates = [f for f in candidates if os.path.getmtime(f) >= start_time]
-                if candidates:
-                    downloaded_file = max(candidates, key=os.path.getmtime)
-
-            # Re-encode to H.264 for Premiere Pro compatibility
-            if not audio_only and downloaded_file and downloaded_file.endswith(".mp4"):
-                codec = self._get_video_codec(downloaded_file)
-                if codec and codec != "h264":
-                    self.after(0, self._set_status, f"Re-encoding to H.264 (was {codec})...")
-                    self.after(0, self._set_progress, 0.5)
-                    self._reencode_to_h264(downloaded_file)
-
-            if self._download_id != my_id:
-                return
-
-            self._last_downloaded_file = downloaded_file
             self.after(0, self._set_progress, 1.0)
-            self.after(0, self._set_status, f"Done! Saved to {output_dir}")
+            if errors:
+                self.after(0, self._set_status,
+                           f"Done — {len(errors)} of {len(urls)} failed. Last error: {errors[-1]}")
+            else:
+                self.after(0, self._set_status, f"Done! Saved to {output_dir}")
         except Exception as e:
+            # Also covers yt-dlp's DownloadCancelled: the hook only raises it once
+            # _download_id has moved past my_id, so it is never reported as an error
             if self._download_id == my_id and not self._cancelled:
                 self.after(0, self._set_status, f"Error: {e}")
                 self.after(0, self._set_progress, 0)
@@ -463,23 +612,209 @@ class App(ctk.CTk):
                 self.after(0, lambda: self.dl_button.configure(state="normal", text="Download"))
                 self.after(0, lambda: self.cancel_button.configure(state="disabled"))
 
+    def _download_one(self, ydl, url, my_id, output_dir, audio_only):
+        """Download and post-process a single URL. Returns the final file path, or None."""
+        import glob
+        start_time = time.time()
+
+        self.after(0, self._set_progress, 0)
+        self.after(0, self._set_status, "Fetching video info...")
+        info = ydl.extract_info(url, download=False)
+        title = info.get("title", "Unknown")
+        duration = info.get("duration_string", "?")
+        self.after(0, lambda t=title, d=duration: self.title_label.configure(text=f"{t}  ({d})"))
+
+        if self._download_id != my_id:
+            return None
+
+        # Get the actual filename yt-dlp will use
+        prepared = ydl.prepare_filename(info)
+        ext = "mp3" if audio_only else "mp4"
+        expected_file = os.path.splitext(prepared)[0] + "." + ext
+
+        self.after(0, self._set_status, "Downloading...")
+        # Reuse the extracted info rather than resolving the URL a second time
+        ydl.process_ie_result(info, download=True)
+
+        if self._download_id != my_id:
+            return None
+
+        # Find the downloaded file
+        downloaded_file = None
+        if os.path.exists(expected_file):
+            downloaded_file = expected_file
+        elif os.path.exists(prepared):
+            # Single-file format that wasn't merged (e.g. .webm/.mkv)
+            downloaded_file = prepared
+        else:
+            # Fallback: find newest mp4/mp3 in output dir created after we started
+            search_ext = "*.mp3" if audio_only else "*.mp4"
+            candidates = glob.glob(os.path.join(output_dir, search_ext))
+            candidates = [f for f in candidates if os.path.getmtime(f) >= start_time]
+            if candidates:
+                downloaded_file = max(candidates, key=os.path.getmtime)
+
+        # Re-encode to H.264 for Premiere Pro compatibility
+        if not audio_only and downloaded_file:
+            probe = self._probe(downloaded_file)
+            vcodec = probe["vcodec"]
+            if vcodec == "h264" and not downloaded_file.endswith(".mp4"):
+                # Only the container is wrong — stream-copy instead of re-encoding
+                self.after(0, self._set_status, "Remuxing to MP4...")
+                self.after(0, self._set_progress, 0)
+                downloaded_file = self._remux_to_mp4(downloaded_file, probe["acodec"], my_id, probe["duration"])
+            elif vcodec and vcodec != "h264":
+                self.after(0, self._set_status, f"Re-encoding to H.264 (was {vcodec})...")
+                self.after(0, self._set_progress, 0)
+                downloaded_file = self._reencode_to_h264(downloaded_file, my_id, probe["duration"])
+
+        return downloaded_file
+
+    def _get_ydl(self, audio_only):
+        """Return the long-lived YoutubeDL for this kind of download, creating it on first use."""
+        ydl = self._ydls.get(audio_only)
+        if ydl is None:
+            opts = dict(YDL_BASE_OPTS, progress_hooks=[self._progress_hook])
+            if audio_only:
+                # Postprocessors are only read when YoutubeDL is constructed
+                opts["postprocessors"] = [{"key": "FFmpegExtractAudio",
+                                           "preferredcodec": "mp3", "preferredquality": "320"}]
+            ydl = self._ydls[audio_only] = yt_dlp_mod().YoutubeDL(opts)
+            atexit.register(ydl.close)
+        return ydl
+
+    def _progress_hook(self, d):
+        if self._download_id != self._ydl_owner:
+            raise yt_dlp_mod().utils.DownloadCancelled()
+        if d["status"] == "downloading":
+            # Fragments can report thousands of times a second; the UI only needs a few
+            now = time.monotonic()
+            if now - self._last_progress_ts < PROGRESS_INTERVAL:
+                return
+            self._last_progress_ts = now
+            total = d.get("total_bytes") or d.get("total_bytes_estimate")
+            downloaded = d.get("downloaded_bytes", 0)
+            speed = d.get("_speed_str", "")
+            eta = d.get("_eta_str", "")
+            pct_str = d.get("_percent_str", "")
+            self._progress_state = (downloaded / total if total and total > 0 else None,
+                                    f"Downloading {pct_str}   Speed: {speed}   ETA: {eta}")
+        elif d["status"] == "finished":
+            self._progress_state = (0.95, "Merging streams...")
+        else:
+            return
+        self.after(0, self._flush_progress)
+
+    def _flush_progress(self):
+        value, text = self._progress_state
+        if value is not None:
+            self._set_progress(value)
+        self._set_status(text)
+
     @staticmethod
-    def _get_video_codec(filepath):
-        cmd = [os.path.join(FFMPEG_DIR, "ffprobe"), "-v", "quiet", "-select_streams", "v:0",
-               "-show_entries", "stream=codec_name", "-of", "csv=p=0", filepath]
-        return subprocess.run(cmd, capture_output=True, text=True).stdout.strip()
+    def _warm_ffmpeg():
+        """Pull ffmpeg/ffprobe into the page cache so the first remux or re-encode starts sooner."""
+        for path in (FFMPEG, FFPROBE):
+            try:
+                with open(path, "rb") as f:
+                    f.read(65536)
+            except OSError:
+                pass
+        # Running ffmpeg loads its shared libraries too; reuse those runs to pick the encoder
+        _detect_h264_encoder()
+        try:
+            subprocess.run([FFPROBE, "-version"], capture_output=True, creationflags=NO_WINDOW)
+        except OSError:
+            pass
 
     @staticmethod
-    def _reencode_to_h264(filepath):
-        tmp_path = filepath + ".tmp.mp4"
-        cmd = [os.path.join(FFMPEG_DIR, "ffmpeg"), "-y", "-i", filepath, "-c:v", "libx264", "-preset", "medium",
-               "-crf", "18", "-c:a", "aac", "-b:a", "256k", "-movflags", "+faststart",
-               "-pix_fmt", "yuv420p", tmp_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            os.replace(tmp_path, filepath)
-        elif os.path.exists(tmp_path):
+    def _probe(filepath):
+        """Return the first video/audio codec ("" if absent) and duration in seconds (None if unknown)."""
+        cmd = [FFPROBE, "-v", "quiet", "-print_format", "json", "-show_streams", "-show_format", filepath]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, creationflags=NO_WINDOW)
+            data = json.loads(result.stdout or "{}")
+        except ValueError:
+            data = {}
+        codecs = {}
+        for stream in data.get("streams", []):
+            codecs.setdefault(stream.get("codec_type"), stream.get("codec_name", ""))
+        try:
+            duration = float(data.get("format", {})["duration"])
+        except (KeyError, TypeError, ValueError):
+            duration = None
+        return {"vcodec": codecs.get("video", ""), "acodec": codecs.get("audio", ""), "duration": duration}
+
+    def _run_ffmpeg(self, cmd, my_id, duration=None):
+        """Run ffmpeg as a child the Cancel button can stop. Returns its exit code.
+
+        Given the input duration in seconds, the progress bar tracks ffmpeg's -progress output.
+        """
+        if duration:
+            # key=value lines such as out_time_us=1234567 on stderr; keep the log to errors only
+            cmd = [cmd[0], "-progress", "pipe:2", "-nostats", "-loglevel", "error", *cmd[1:]]
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                    text=True, errors="replace", creationflags=NO_WINDOW)
+        else:
+            # ffmpeg's log is never read, so don't pipe and decode it
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    creationflags=NO_WINDOW)
+        self._ffmpeg_proc = proc
+        # Cancel may have landed between the caller's last check and the spawn
+        if self._download_id != my_id:
+            proc.terminate()
+        try:
+            if duration:
+                total_us = duration * 1_000_000
+                for line in proc.stderr:
+                    # A terminated ffmpeg still writes a last progress block; keep it off the bar
+                    if self._download_id != my_id:
+                        continue
+                    key, _, value = line.strip().partition("=")
+                    if key == "out_time_us" and value.isdigit():
+                        self.after(0, self._set_progress, min(int(value) / total_us, 1.0))
+            return proc.wait()
+        finally:
+            self._ffmpeg_proc = None
+
+    def _remux_to_mp4(self, filepath, acodec, my_id, duration=None):
+        """Stream-copy an H.264 file into an MP4 container. Returns the resulting path."""
+        out_path = os.path.splitext(filepath)[0] + ".mp4"
+        tmp_path = out_path + ".tmp.mp4"
+        # MP4 audio for Premiere should be AAC; anything else (e.g. Opus) is transcoded
+        audio = ["-c:a", "copy"] if acodec in ("", "aac", "mp4a") else ["-c:a", "aac", "-b:a", "256k"]
+        cmd = [FFMPEG, "-y", "-i", filepath, "-c:v", "copy", *audio,
+               "-movflags", "+faststart", "-f", "mp4", tmp_path]
+        if self._run_ffmpeg(cmd, my_id, duration) == 0:
+            os.replace(tmp_path, out_path)
+            os.remove(filepath)
+            return out_path
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return filepath
+
+    def _reencode_to_h264(self, filepath, my_id, duration=None):
+        """Re-encode to H.264/AAC in an MP4 container. Returns the resulting path."""
+        out_path = os.path.splitext(filepath)[0] + ".mp4"
+        tmp_path = out_path + ".tmp.mp4"
+        # A hardware encoder that passed the test encode can still reject real input
+        encoder = _detect_h264_encoder()
+        encoders = [encoder] if encoder == "libx264" else [encoder, "libx264"]
+        for encoder in encoders:
+            hwaccel = [] if encoder == "libx264" else ["-hwaccel", "auto"]
+            cmd = [FFMPEG, "-y", *hwaccel, "-i", filepath, *H264_ENCODER_ARGS[encoder],
+                   "-c:a", "aac", "-b:a", "256k", "-movflags", "+faststart",
+                   "-pix_fmt", "yuv420p", tmp_path]
+            if self._run_ffmpeg(cmd, my_id, duration) == 0:
+                os.replace(tmp_path, out_path)
+                if out_path != filepath:
+                    os.remove(filepath)
+                return out_path
+            if self._download_id != my_id:
+                break
+        if os.path.exists(tmp_path):
             os.remove(tmp_path)
+        return filepath
 
 
 if __name__ == "__main__":